@@ -1,12 +1,30 @@
+import json
 from flask import Flask
 from .models import Base
-from sqlalchemy import Engine, create_engine
+from sqlalchemy import Engine, create_engine, event, exc, inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, scoped_session, Session
 from contextlib import contextmanager
 from functools import wraps
 
+from beets_flask.logger import log
+
 
 engine : Engine = create_engine("sqlite://///home/beetle/beets-flask-sqlite.db?timeout=5")
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    """
+    WAL lets readers and the writer work concurrently, and with synchronous=NORMAL
+    commits no longer fsync (only checkpoints do).
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
 db_session_factory = scoped_session(sessionmaker(bind=engine))
 
 @contextmanager
@@ -66,6 +84,61 @@ def with_db_session(func):
 
 def create_tables(engine) -> None:
     Base.metadata.create_all(bind=engine)
+    _migrate_track_paths(engine)
+    _seed_tables(engine)
+
+    # create_all skips existing tables, so databases created before we
+    # declared indices need them added explicitly.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except exc.IntegrityError as e:
+                # e.g. duplicate album folders from before they had to be unique
+                log.warning(f"Could not create index {index.name}: {e}")
+
+
+def _seed_tables(engine) -> None:
+    """
+    Rows that always have to exist. Idempotent, so we can run it on every start.
+    """
+    from beets_flask.models import TagGroup
+
+    with engine.begin() as conn:
+        conn.execute(
+            sqlite_insert(TagGroup).values(id="Unsorted").on_conflict_do_nothing()
+        )
+
+
+def _migrate_track_paths(engine) -> None:
+    """
+    Tags used to keep their track lists in three newline-delimited columns.
+    Move them to the single `_track_paths_json` column.
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("tag")}
+    if "_track_paths_json" in columns:
+        return
+
+    old_columns = {
+        "current": "_track_paths",
+        "before": "_track_paths_before",
+        "after": "_track_paths_after",
+    }
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE tag ADD COLUMN _track_paths_json VARCHAR"))
+        if not set(old_columns.values()) <= columns:
+            return
+        rows = conn.execute(
+            text(f"SELECT id, {', '.join(old_columns.values())} FROM tag")
+        ).all()
+        for id, *values in rows:
+            data = {k: v.split("\n") if v else [] for k, v in zip(old_columns, values)}
+            if not any(data.values()):
+                continue
+            conn.execute(
+                text("UPDATE tag SET _track_paths_json = :data WHERE id = :id"),
+                {"data": json.dumps(data), "id": id},
+            )
 
 
 def setup_db(app: Flask) -> None:
@@ -79,8 +152,13 @@ def setup_db(app: Flask) -> None:
 
 
 def reset_database():
-    from beets_flask.models import Tag, TagGroup
+    """
+    Delete all rows from all our tables, in a single transaction.
+    Uses core deletes so no rows are loaded into the session.
+    """
     with db_session() as session:
-        session.query(TagGroup).delete()
-        session.query(Tag).delete()
+        # children before parents, to not violate foreign keys
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
         session.commit()
+    _seed_tables(engine)
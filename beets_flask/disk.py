@@ -1,12 +1,22 @@
 import os
-import glob
+import stat
 import cachetools
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from time import time
-from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.observers.polling import PollingObserver
-from watchdog.events import FileSystemEventHandler, FileSystemEvent, FileMovedEvent
+from watchdog.events import (
+    EVENT_TYPE_CLOSED,
+    EVENT_TYPE_CREATED,
+    EVENT_TYPE_DELETED,
+    EVENT_TYPE_MODIFIED,
+    EVENT_TYPE_MOVED,
+    FileMovedEvent,
+    FileSystemEvent,
+    FileSystemEventHandler,
+)
 
 from . import invoker
 from . import utility as ut
@@ -14,8 +24,19 @@ from . import utility as ut
 from .logger import log
 
 inbox_dir = os.environ.get("INBOX", "/music/inbox")
+# the inbox dict can hold the whole tree, while folder sizes are single ints.
+# keep them apart so many small entries cannot evict the big one.
 _cache = cachetools.TTLCache(maxsize=100, ttl=900)
 _cache_lock = threading.Lock()
+_stats_cache = cachetools.TTLCache(maxsize=1024, ttl=900)
+
+# rebuilding the inbox dict after changes happens in the background
+_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inbox")
+_refresh_lock = threading.Lock()
+_refresh_queued = False
+_refresh_notify = False
+# the tree of the last background rebuild, only touched by its worker
+_refreshed_inbox = None
 
 
 # ------------------------------------------------------------------------------------ #
@@ -31,10 +52,7 @@ def init():
     log.debug(f"Starting observer for {inbox_dir}")
     try:
         handler = InboxHandler()
-        # the polling observer worked more reliably for me than the default observer.
-        observer = PollingObserver(timeout=handler.poll_interval)
-        observer.schedule(handler, path=inbox_dir, recursive=True)
-        observer.start()
+        observer = _start_observer(handler)
     except FileNotFoundError:
         log.error(
             f"Could not find inbox directory ({inbox_dir}). Check your INBOX env var."
@@ -56,6 +74,46 @@ def init():
         target=try_to_import, args=(observer, handler), daemon=True
     ).start()
 
+    # warm the cache, so the first request does not have to walk the inbox
+    refresh_inbox_dict_async(notify=False)
+
+
+def _start_observer(handler: "InboxHandler"):
+    """
+    Prefer the native observer (inotify, FSEvents), which only wakes up on changes.
+    The polling observer re-scans the whole inbox every few seconds, but works
+    where native events do not (e.g. network mounts, or bind mounts under
+    Docker Desktop). Set `BF_FORCE_POLL=1` to always use it.
+    Unlike polling, the native observer also reports reads (opened events),
+    `InboxHandler` ignores those.
+    """
+    if os.environ.get("BF_FORCE_POLL", "0") != "1":
+        observer = Observer()
+        try:
+            observer.schedule(handler, path=inbox_dir, recursive=True)
+            observer.start()
+            return observer
+        except FileNotFoundError:
+            raise
+        except OSError as e:
+            # e.g. inotify watch limit reached
+            log.warning(f"Native file observer failed ({e}), falling back to polling")
+
+    observer = PollingObserver(timeout=handler.poll_interval)
+    observer.schedule(handler, path=inbox_dir, recursive=True)
+    observer.start()
+    return observer
+
+
+# events that change the content of the inbox. "closed" is only sent after writing.
+_CHANGE_EVENTS = {
+    EVENT_TYPE_CREATED,
+    EVENT_TYPE_DELETED,
+    EVENT_TYPE_MODIFIED,
+    EVENT_TYPE_MOVED,
+    EVENT_TYPE_CLOSED,
+}
+
 
 class InboxHandler(FileSystemEventHandler):
 
@@ -81,6 +139,10 @@ class InboxHandler(FileSystemEventHandler):
                     refresh_folder(path)
 
     def on_any_event(self, event: FileSystemEvent):
+        if event.event_type not in _CHANGE_EVENTS:
+            # e.g. the native observer reports files opened for reading,
+            # as beets does during a preview. those must not retrigger us.
+            return
         log.debug("got %r", event)
 
         if isinstance(event, FileMovedEvent):
@@ -90,8 +152,9 @@ class InboxHandler(FileSystemEventHandler):
         if os.path.basename(fullpath).startswith("."):
             return
 
-        get_inbox_dict(use_cache=False)
-        ut.update_client_view("inbox")
+        # clients are notified once the rebuilt dict is ready
+        refresh_inbox_dict_async()
+        all_album_folders.cache_clear()
 
         try:
             album_folder = album_folders_from_track_paths([fullpath])[0]
@@ -142,17 +205,81 @@ def refresh_all_folders(
 
 def get_inbox_dict(use_cache: bool = True) -> dict:
     global _cache
+    stamp = _mtime_stamp(inbox_dir)
     with _cache_lock:
-        if use_cache and "inbox" in _cache:
-            inbox = _cache["inbox"]
-        else:
-            log.debug("renewing cache for inbox dict")
-            inbox = path_to_dict(inbox_dir)
-            _cache["inbox"] = inbox
+        cached = _cache.get("inbox")
+        if use_cache and cached is not None and cached[0] == stamp:
+            return cached[1]
+
+    # walk without holding the lock, so cached reads do not wait for us
+    log.debug("renewing cache for inbox dict")
+    inbox = path_to_dict(inbox_dir)
+    with _cache_lock:
+        _cache["inbox"] = (stamp, inbox)
 
     return inbox
 
 
+def _mtime_stamp(path: str) -> tuple:
+    """
+    Modification times of `path` and its direct subfolders.
+
+    Adding or removing an album changes one of them, so a cached tree with
+    another stamp is outdated. Changes further down are not seen, there
+    the TTL of the cache (and the watchdog) has to catch up.
+    """
+    try:
+        stamps = [os.stat(path).st_mtime_ns]
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    stamps.append((entry.name, entry.stat().st_mtime_ns))
+    except OSError:
+        # no stamp, no cache hit
+        return (None, time())
+    stamps[1:] = sorted(stamps[1:])
+    return tuple(stamps)
+
+
+def refresh_inbox_dict_async(notify: bool = True):
+    """
+    Rebuild the cached inbox dict in a background thread, then tell clients.
+    Calls that arrive while a rebuild is queued are merged into it.
+    Until the new dict is ready, `get_inbox_dict` returns the old one.
+    """
+    global _refresh_queued, _refresh_notify
+    with _refresh_lock:
+        _refresh_notify = _refresh_notify or notify
+        if _refresh_queued:
+            return
+        _refresh_queued = True
+    _refresh_executor.submit(_refresh_inbox_dict)
+
+
+def _refresh_inbox_dict():
+    global _refresh_queued, _refresh_notify, _refreshed_inbox
+    with _refresh_lock:
+        # later changes need another run, since we may have walked past them
+        _refresh_queued = False
+        notify = _refresh_notify
+        _refresh_notify = False
+    try:
+        inbox = get_inbox_dict(use_cache=False)
+    except Exception as e:
+        log.error(f"Could not refresh inbox dict: {e}")
+        return
+    # compare with our last run, not the cache: requests may have rebuilt that
+    # already, without telling anyone.
+    previous = _refreshed_inbox
+    _refreshed_inbox = inbox
+    if previous == inbox:
+        # e.g. only file contents or hidden files changed, nothing to show
+        return
+    if notify:
+        # one update for all events merged into this run
+        ut.update_client_view("inbox")
+
+
 def path_to_dict(root_dir, relative_to="/") -> dict:
     """
     Generate our nested dict structure for the specified path.
@@ -168,32 +295,108 @@ def path_to_dict(root_dir, relative_to="/") -> dict:
     if not os.path.isdir(root_dir):
         raise FileNotFoundError(f"Path `{root_dir}` does not exist or is no directory.")
 
-    files = glob.glob(root_dir + "/**/*", recursive=True)
-    files = sorted(files, key=lambda s: s.lower())
-    album_folders = album_folders_from_track_paths(files)
-    folder_structure = {
+    folder_structure = _dir_node(relative_to)
+
+    # the folders between `relative_to` and `root_dir` are part of the structure,
+    # too. Only the (walked) last one can be an album.
+    f = root_dir[len(relative_to) :] if root_dir.startswith(relative_to) else root_dir
+    path_components = [p for p in f.split("/") if p]
+    if not path_components:
+        _walk_dir(root_dir, folder_structure)
+        return folder_structure
+
+    current_dict = folder_structure
+    current_path = relative_to
+    for component in path_components:
+        current_path = os.path.join(current_path, component)
+        node = _dir_node(current_path)
+        current_dict["children"][component] = node
+        current_dict = node
+    _walk_dir(root_dir, current_dict)
+
+    # same as for any other empty dir: without content, no path to it.
+    if not current_dict["children"]:
+        folder_structure["children"] = {}
+
+    return folder_structure
+
+
+def _dir_node(full_path: str) -> dict:
+    return {
         "type": "directory",
-        "is_album": relative_to in album_folders,
-        "full_path": relative_to,
+        "is_album": False,
+        "full_path": full_path,
         "children": {},
     }
-    for file in files:
-        f = file[len(relative_to) :] if file.startswith(relative_to) else file
-        path_components = [p for p in f.split("/") if p]
-        current_dict = folder_structure
-        current_path = relative_to
-        for component in path_components:
-            current_path = os.path.join(current_path, component)
-            if component not in current_dict["children"]:
-                current_dict["children"][component] = {
-                    "type": "file" if os.path.isfile(file) else "directory",
-                    "is_album": current_path in album_folders,
-                    "full_path": current_path,
+
+
+def _walk_dir(path: str, node: dict):
+    """
+    Fill `node` with the (non-hidden) content of `path`, recursively.
+    """
+    # folders are created when listed in their parent, and filled when walked
+    nodes = {path: node}
+    join = os.path.join
+    for dirpath, entries, is_album in _scan_tree(path):
+        dir_node = nodes.pop(dirpath)
+        dir_node["is_album"] = is_album
+        children = dir_node["children"]
+        parent_path = dir_node["full_path"]
+        for entry in entries:
+            full_path = join(parent_path, entry.name)
+            if entry.is_dir():
+                child = _dir_node(full_path)
+                nodes[entry.path] = child
+            else:
+                child = {
+                    # e.g. broken symlinks are neither
+                    "type": "file" if entry.is_file() else "directory",
+                    "is_album": False,
+                    "full_path": full_path,
                     "children": {},
                 }
-            current_dict = current_dict["children"][component]
+            children[entry.name] = child
 
-    return folder_structure
+
+def _scan_tree(path: str):
+    """
+    Walk the folders below (and including) `path` with os.scandir, skipping
+    hidden entries. The type info of scandir is used, so files and folders
+    need no extra stat.
+
+    A folder is an album if it holds any file, or anything named like an audio file.
+
+    # Yields:
+    - tuple[str, list[os.DirEntry], bool]: folder path, its non-hidden entries
+        sorted case-insensitively, and whether it is an album folder.
+    """
+    # iterative, so deep trees do not hit the recursion limit.
+    stack = [path]
+    # local names for the hot loop
+    push = stack.append
+    audio_extensions = ut.AUDIO_EXTENSIONS
+    while stack:
+        dirpath = stack.pop()
+        try:
+            with os.scandir(dirpath) as it:
+                # lower-case each name once, for sorting and the extension check
+                scanned = sorted(((e.name.lower(), e) for e in it), key=itemgetter(0))
+        except OSError:
+            continue
+
+        entries = []
+        is_album = False
+        for name_lower, entry in scanned:
+            if name_lower.endswith(audio_extensions):
+                is_album = True
+            if entry.name.startswith("."):
+                continue
+            entries.append(entry)
+            if entry.is_dir():
+                push(entry.path)
+            elif entry.is_file():
+                is_album = True
+        yield dirpath, entries, is_album
 
 
 def tree(folder_structure) -> str:
@@ -231,29 +434,83 @@ def album_folders_from_track_paths(track_paths: list):
 
     album_folders = []
     for path in track_paths:
-        if os.path.isfile(path):
-            album_folders.append(os.path.dirname(os.path.abspath(path)))
-        elif os.path.isdir(path):
+        # normalize once, abspath calls getcwd for relative paths
+        path = os.path.abspath(path)
+        # one stat instead of isfile + isdir
+        try:
+            mode = os.stat(path).st_mode
+        except (OSError, ValueError):
+            continue
+        if stat.S_ISREG(mode):
+            album_folders.append(os.path.dirname(path))
+        elif stat.S_ISDIR(mode):
             for file in os.listdir(path):
                 if file.lower().endswith(ut.AUDIO_EXTENSIONS):
-                    album_folders.append(os.path.abspath(path))
+                    album_folders.append(path)
                     break
-    return sorted(
-        [str(folder) for folder in set(album_folders)], key=lambda s: s.lower()
-    )
+    return sorted(set(album_folders), key=str.lower)
 
 
+@cachetools.cached(
+    cache=cachetools.TTLCache(maxsize=256, ttl=60),
+    key=lambda root_dir=inbox_dir: os.path.abspath(root_dir),
+    lock=threading.Lock(),
+)
 def all_album_folders(root_dir: str = inbox_dir):
-    files = sorted(glob.glob(root_dir + "/**/*", recursive=True))
-    return album_folders_from_track_paths(files)
+    """
+    All album folders below `root_dir`. Cached per root for a minute,
+    and cleared whenever the inbox changes (see `InboxHandler`).
+    """
+    return sorted(
+        [
+            dirpath
+            for dirpath, _, is_album in _scan_tree(os.path.abspath(root_dir))
+            if is_album
+        ],
+        key=str.lower,
+    )
 
 
-def dir_size(dir: str, use_cache: bool = True):
-    global _cache
-    if use_cache and dir in _cache:
-        return _cache[dir]
+def dir_size(dir: str, use_cache: bool = True) -> int:
+    if use_cache and dir in _stats_cache:
+        return _stats_cache[dir]
 
-    size = sum(file.stat().st_size for file in Path(dir).rglob("*"))
-    _cache[dir] = size
+    size = _sum_tree(dir)
+    _stats_cache[dir] = size
 
     return size
+
+
+def _sum_tree(path: str) -> int:
+    """
+    Apparent size of everything below `path`, folders included.
+
+    This is what `du -sb` reports: the sum of `st_size` over `path` and all
+    entries below it. Symlinks are counted themselves, not followed, and hard
+    links only once.
+    """
+    try:
+        total = os.stat(path, follow_symlinks=False).st_size
+    except OSError:
+        return 0
+    seen_links = set()
+    stack = [path]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif st.st_nlink > 1:
+                        if (st.st_dev, st.st_ino) in seen_links:
+                            continue
+                        seen_links.add((st.st_dev, st.st_ino))
+                    total += st.st_size
+                except OSError:
+                    pass
+    return total
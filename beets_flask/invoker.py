@@ -142,7 +142,7 @@ def runImport(
     with db_session() as session:
         log.debug(f"Import task on {tagId}")
 
-        bt = Tag.get_by(Tag.id == tagId)
+        bt = Tag.get_by(Tag.id == tagId, session=session)
 
         if bt is None:
             raise InvalidUsage(f"Tag {tagId} not found in database")
@@ -2,12 +2,14 @@ from __future__ import annotations
 from typing import Optional, TYPE_CHECKING
 from datetime import datetime
 import glob
+import json
 import os
 from uuid import uuid4 as uuid
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, select
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import ForeignKey, event, inspect, select, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Mapped, mapped_column, relationship, Session
 from sqlalchemy.orm.session import make_transient
 
 from .base import Base
@@ -25,14 +27,14 @@ class Tag(Base):
     # we might consider to use folders as ids:
     # for now we want to allow only one tag per folder.
     id: Mapped[str] = mapped_column(primary_key=True)
-    album_folder: Mapped[str]
+    album_folder: Mapped[str] = mapped_column(index=True, unique=True)
 
     status: Mapped[str]
     kind: Mapped[str]
     _valid_statuses = ["dummy", "pending", "tagging", "failed", "unmatched"]
     _valid_kind = ["preview", "import"]
 
-    _group_id: Mapped[str] = mapped_column(ForeignKey("tag_group.id"))
+    _group_id: Mapped[str] = mapped_column(ForeignKey("tag_group.id"), index=True)
     _tag_group: Mapped[TagGroup] = relationship(back_populates="tag_ids")
 
     distance: Mapped[Optional[float]]
@@ -46,10 +48,11 @@ class Tag(Base):
     created_at: Mapped[datetime]
     updated_at: Mapped[datetime]
 
-    # the track list we keep ourselves
-    _track_paths: Mapped[Optional[str]]
-    _track_paths_before: Mapped[Optional[str]]
-    _track_paths_after: Mapped[Optional[str]]
+    # the track lists we keep ourselves, as one json object
+    # `{"current": [...], "before": [...], "after": [...]}`
+    _track_paths_json: Mapped[Optional[str]]
+    # (raw json, parsed dict) of the last decode
+    _track_paths_cache = None
 
     def __init__(
         self,
@@ -66,7 +69,7 @@ class Tag(Base):
         track_paths_after=None,
     ):
         self.album_folder = album_folder
-        self.id = str(id) if id is not None else str(uuid())
+        self.id = id if id is not None else str(uuid())
         self.created_at = datetime.now()
         self.updated_at = datetime.now()
         self.group_id = group_id or "Unsorted"
@@ -83,39 +86,50 @@ class Tag(Base):
         self.track_paths_after = track_paths_after or []
         # self.track_paths = self.eligible_track_paths()
 
-    # parse list of strings as \n delimited. sqlite supports no lists.
+    # sqlite supports no lists. keep all three in one json column,
+    # decoded at most once per loaded value.
+    def _get_track_paths(self, key: str) -> list[str]:
+        raw = self._track_paths_json
+        if raw is None:
+            return []
+        if self._track_paths_cache is None or self._track_paths_cache[0] is not raw:
+            self._track_paths_cache = (raw, json.loads(raw))
+        # a copy, so changing the list cannot diverge from the stored json
+        return list(self._track_paths_cache[1].get(key, []))
+
+    def _set_track_paths(self, key: str, paths):
+        data = {
+            k: self._get_track_paths(k) for k in ("current", "before", "after")
+        }
+        data[key] = list(paths) if paths else []
+        if any(data.values()):
+            self._track_paths_json = json.dumps(data)
+        else:
+            self._track_paths_json = None
+
     @property
     def track_paths_before(self):
-        if self._track_paths_before is not None:
-            return self._track_paths_before.split("\n")
-        else:
-            return []
+        return self._get_track_paths("before")
 
     @property
     def track_paths_after(self):
-        if self._track_paths_after is not None:
-            return self._track_paths_after.split("\n")
-        else:
-            return []
+        return self._get_track_paths("after")
 
     @property
     def track_paths(self):
-        if self._track_paths is not None:
-            return self._track_paths.split("\n")
-        else:
-            return []
+        return self._get_track_paths("current")
 
     @track_paths_before.setter
     def track_paths_before(self, paths):
-        self._track_paths_before = "\n".join(paths) if paths else None
+        self._set_track_paths("before", paths)
 
     @track_paths_after.setter
     def track_paths_after(self, paths):
-        self._track_paths_after = "\n".join(paths) if paths else None
+        self._set_track_paths("after", paths)
 
     @track_paths.setter
     def track_paths(self, paths):
-        self._track_paths = "\n".join(paths) if paths else None
+        self._set_track_paths("current", paths)
 
     def eligible_track_paths(self):
         files = glob.glob(str(self.album_folder) + "/**/*")
@@ -134,21 +148,15 @@ class Tag(Base):
 
     @group_id.setter
     def group_id(self, group_id):
-        from beets_flask.db_engine import db_session
-        with db_session() as session:
-            tag_group = session.query(TagGroup).filter_by(id=group_id).first()
-            if not tag_group:
-                tag_group = TagGroup(id=group_id)
-                session.add(tag_group)
-                session.commit()
-
-            self._group_id = group_id
-            self._tag_group = tag_group
+        # the group row is created on flush, see `_ensure_tag_group`
+        self._group_id = group_id
 
     @property
     def album_folder_basename(self):
-        return os.path.basename(str(self.album_folder))
-
+        if os.sep == "/":
+            # album_folder is a str already, skip fspath and the generic split
+            return self.album_folder.rpartition("/")[2]
+        return os.path.basename(self.album_folder)
 
     def to_dict(self):
         data = {c.name: getattr(self, c.name) for c in self.__table__.columns}  # type: ignore
@@ -164,3 +172,41 @@ class Tag(Base):
         return self
 
 
+@event.listens_for(Tag, "before_insert")
+@event.listens_for(Tag, "before_update")
+def _ensure_tag_group(mapper, connection, target: Tag):
+    """
+    Create the tag group of `target` if needed, in one statement and without
+    reading it. Runs in the flushing transaction, so it is committed or
+    rolled back together with the tag.
+    """
+    group_id = target._group_id
+    if group_id is None or group_id == "Unsorted":
+        # seeded on startup, see `db_engine._seed_tables`
+        return
+    if not inspect(target).attrs._group_id.history.has_changes():
+        return
+    connection.execute(
+        sqlite_insert(TagGroup).values(id=group_id).on_conflict_do_nothing()
+    )
+
+
+def bulk_insert_tags(rows: list[dict], session: Session):
+    """
+    Insert many tags with a single multi-row INSERT, bypassing the unit of work.
+
+    Each row is a dict of column values, e.g. `{"album_folder": ..., "kind": "preview"}`.
+    `id`, `status`, `_group_id` and time stamps default like in `Tag.__init__`.
+    All rows should provide the same keys. Referenced tag groups have to exist
+    already. The caller commits.
+    """
+    now = datetime.now()
+    defaults = {
+        "status": "pending",
+        "_group_id": "Unsorted",
+        "created_at": now,
+        "updated_at": now,
+    }
+    session.execute(
+        insert(Tag), [{**defaults, "id": str(uuid()), **row} for row in rows]
+    )
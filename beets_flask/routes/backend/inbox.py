@@ -15,7 +15,7 @@ def get_all():
     use_cache: bool = True
     """
 
-    use_cache = bool(request.args.get("use_cache", False))
+    use_cache = request.args.get("use_cache", "true").lower() != "false"
     inbox = get_inbox_dict(use_cache=use_cache)
     # log.debug(f"returning inbox {inbox=}")
 
@@ -59,7 +59,9 @@ def compute_stats(folder=None):
     # TODO: add all audio files
     with os.scandir(folder) as it:
         for entry in it:
-            if entry.is_file() and entry.name.endswith(AUDIO_EXTENSIONS):
+            # the name check needs no syscall, do it first.
+            # is_file() and stat() reuse what scandir already cached.
+            if entry.name.endswith(AUDIO_EXTENSIONS) and entry.is_file():
                 count += 1
                 size_bytes += entry.stat().st_size
 
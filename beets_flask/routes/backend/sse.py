@@ -14,6 +14,10 @@ sse_bp.register_blueprint(sse, url_prefix="/stream")
 # print full details of the blueprint
 log.debug(f"{sse_bp.subdomain=}")
 
+# reused for all updates, so we keep the connection to the server alive
+# instead of opening a new one each time.
+_publish_session = requests.Session()
+
 
 def update_client_view(
     type: Literal["tag", "inbox"],
@@ -33,10 +37,17 @@ def update_client_view(
         },
     }
 
-    log.debug(f"update_client_view: {payload}")
-    response = requests.post("http://localhost:5001/api_v1/sse/publish", json=payload)
+    log.debug("update_client_view: %s", payload)
+    try:
+        # callers (e.g. import jobs) wait for this, do not let them hang
+        response = _publish_session.post(
+            "http://localhost:5001/api_v1/sse/publish", json=payload, timeout=5
+        )
+    except requests.RequestException as e:
+        log.debug("Failed to update client view: %s", e)
+        return
     if response.status_code != 200:
-        log.debug(f"Failed to update client view: {response.json()}")
+        log.debug("Failed to update client view: %s", response.text)
 
 
 @sse_bp.route("/publish", methods=["POST"])
@@ -6,6 +6,7 @@ TagGroups are just a way to group tags together. A typical use case would be a p
 
 from flask import Blueprint, request, jsonify, current_app
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 
 from beets_flask.models import Tag, TagGroup
 from beets_flask.db_engine import db_session, with_db_session, Session
@@ -19,7 +20,12 @@ def get_all():
     """Get all tag Groups"""
     with db_session() as session:
         # for now, group ids are just their name
-        stmt = select(TagGroup).order_by(TagGroup.id)
+        # to_dict needs the tags of each group, fetch them in one go
+        stmt = (
+            select(TagGroup)
+            .options(selectinload(TagGroup.tag_ids))
+            .order_by(TagGroup.id)
+        )
         groups = session.execute(stmt).scalars().all()
         return [g.to_dict() for g in groups]
 
@@ -64,9 +64,11 @@ def read_and_forward(timeout_seconds=0.1, max_bytes=1024 * 20):
         raise
 
 
-def read_forward_continuously(sleep_seconds=0.01):
+def read_forward_continuously():
     while config["client_connected"]:
-        sio.sleep(sleep_seconds)  # type: ignore
+        # the select in read_and_forward does the waiting. sleeping on top of
+        # it only delays every chunk of output, we just yield to other greenlets.
+        sio.sleep(0)  # type: ignore
         try:
             read_and_forward()
         except Exception as e:
@@ -92,14 +94,19 @@ def pty_input(sid, data):
     terminal.
     """
     if config["fd"]:
-        log.debug(f"{sid} received input from browser: {data['input']} connected: {str(config['client_connected'])}")
+        log.debug(
+            "%s received input from browser: %s connected: %s",
+            sid,
+            data["input"],
+            config["client_connected"],
+        )
         os.write(config["fd"], data["input"].encode())
 
 
 @sio.on("resize", namespace="/terminal")
 def resize(sid, data):
     if config["fd"]:
-        log.debug(f"{sid} Resizing window to {data['rows']}x{data['cols']}")
+        log.debug("%s Resizing window to %sx%s", sid, data["rows"], data["cols"])
         set_winsize(config["fd"], data["rows"], data["cols"])
 
 
@@ -160,4 +167,4 @@ def disconnect(sid):
 
 @sio.on("*", namespace="/terminal")
 def any_event(event, sid, data):
-    log.debug(f"sid {sid} undhandled event {event} with data {data}")
+    log.debug("sid %s undhandled event %s with data %s", sid, event, data)
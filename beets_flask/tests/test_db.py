@@ -1,5 +1,7 @@
 import os, shutil
-from beets_flask.models import Tag
+import pytest
+from beets_flask.models import Tag, TagGroup
+from beets_flask.models.tag import bulk_insert_tags
 from beets_flask.db_engine import db_session, reset_database
 
 from .test_flask import app, client, BACKEND_URL
@@ -45,6 +47,30 @@ def test_delete_tag():
     assert read_tag is None
 
 
+def test_rollback_discards_tag_and_group():
+    with pytest.raises(RuntimeError):
+        with db_session() as session:
+            tag = Tag(album_folder=folder, kind="preview", group_id="rollback_group")
+            session.add(tag)
+            session.flush()
+            raise RuntimeError("abort")
+
+    assert Tag.get_by(Tag.album_folder == folder) is None
+    assert TagGroup.get_by(TagGroup.id == "rollback_group") is None
+
+
+def test_bulk_insert_tags():
+    with db_session() as session:
+        bulk_insert_tags(
+            [{"album_folder": f"{folder}/{i}", "kind": "preview"} for i in range(3)],
+            session=session,
+        )
+    for i in range(3):
+        read_tag = Tag.get_by(Tag.album_folder == f"{folder}/{i}")
+        assert read_tag is not None
+        assert read_tag.group_id == "Unsorted"
+
+
 def test_add_tag_route(client):
     os.makedirs(folder, exist_ok=True)
     response = client.post(
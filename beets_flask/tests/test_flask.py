@@ -50,3 +50,55 @@ def test_inbox_content(client):
     assert "dummy_album" in response.data.decode("utf-8")
     assert "track1.mp3" in response.data.decode("utf-8")
     shutil.rmtree("/music/inbox/dummy_album/")
+
+def test_folder_structure(client, tmp_path):
+    album = tmp_path / "artist" / "Album"
+    album.mkdir(parents=True)
+    (album / "b.mp3").touch()
+    (album / "A.mp3").touch()
+    (album / ".hidden.mp3").touch()
+    (tmp_path / "artist" / "empty").mkdir()
+
+    response = client.get(
+        BACKEND_URL + "/inbox/path" + str(tmp_path), follow_redirects=True
+    )
+    assert response.status_code == 200
+
+    # the requested folder is the root of the structure
+    artist = response.get_json()["children"]["artist"]
+    assert not artist["is_album"]
+    assert list(artist["children"]) == ["Album", "empty"]
+
+    album_dict = artist["children"]["Album"]
+    assert album_dict["is_album"]
+    assert album_dict["full_path"] == str(album)
+    # sorted case-insensitive, hidden files skipped
+    assert list(album_dict["children"]) == ["A.mp3", "b.mp3"]
+    assert album_dict["children"]["A.mp3"]["type"] == "file"
+
+
+def test_inbox_uses_cache(client, monkeypatch):
+    from beets_flask import disk
+
+    calls = []
+    path_to_dict = disk.path_to_dict
+
+    def counting_path_to_dict(*args, **kwargs):
+        calls.append(args)
+        return path_to_dict(*args, **kwargs)
+
+    monkeypatch.setattr(disk, "path_to_dict", counting_path_to_dict)
+
+    response = client.get(BACKEND_URL + "/inbox", follow_redirects=True)
+    assert response.status_code == 200
+    n_calls = len(calls)
+
+    # nothing changed, so the second request is served from the cache
+    response = client.get(BACKEND_URL + "/inbox", follow_redirects=True)
+    assert response.status_code == 200
+    assert len(calls) == n_calls
+
+    response = client.get(
+        BACKEND_URL + "/inbox?use_cache=false", follow_redirects=True
+    )
+    assert len(calls) == n_calls + 1